@@ -1,5 +1,4 @@
 from ._version import __version__
 
 import logging
-logging.basicConfig()
 logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -17,7 +17,7 @@ from papers.extract import fetch_bibtex_by_doi
 from papers.encoding import parse_file, format_file, family_names, format_entries
 from papers.config import bcolors, Config, search_config, CONFIG_FILE, CONFIG_FILE_LOCAL, DATA_DIR, CONFIG_FILE_LEGACY
 from papers.duplicate import list_duplicates, list_uniques, edit_entries
-from papers.bib import Biblio, FUZZY_RATIO, DEFAULT_SIMILARITY, entry_filecheck, backupfile, isvalidkey
+from papers.bib import Biblio, FUZZY_RATIO, DEFAULT_SIMILARITY, entry_filecheck, backupfile, isvalidkey, prefetch_pdf_bibtex
 from papers import __version__
 
 
@@ -89,7 +89,7 @@ def _restore_from_backupdir(config):
         cmd = f"add {backupfile} --bibtex {config.bibtex} --filesdir {config.filesdir} --no-git"
     # return sp.check_call(f"PYTHONPATH={Path(papers.__file__).parent.parent} python3 -m papers {cmd}", shell=True)
     # Here we avoid starting a new process with re-importing python libs etc
-    logger.info("papers "+cmd)
+    logger.info("papers %s", cmd)
     main(cmd.split())
 
 def _git_undo(config):
@@ -136,9 +136,9 @@ def savebib(biblio, config):
     Given a Biblio object and its configuration, save them to disk.  If you're using the git bib tracker, will trigger a git commit there.
     """
     if papers.config.DRYRUN:
-        logger.info(f'DRYRUN: NOT saving {config.bibtex}')
+        logger.info('DRYRUN: NOT saving %s', config.bibtex)
         return
-    logger.info(f'Saving {config.bibtex}')
+    logger.info('Saving %s', config.bibtex)
     if biblio is not None:
         biblio.save(config.bibtex)
     if config.file and config.git:
@@ -236,7 +236,7 @@ def installcmd(parser, o, config):
 
     if not o.bibtex:
         if len(bibtex_files) > 1:
-            logger.warning("Several bibtex files found: "+" ".join([str(b) for b in bibtex_files]))
+            logger.warning("Several bibtex files found: %s", " ".join([str(b) for b in bibtex_files]))
         if bibtex_files:
             default_bibtex = bibtex_files[0]
         if prompt:
@@ -282,14 +282,14 @@ def installcmd(parser, o, config):
     bibtex = Path(o.bibtex) if o.bibtex else None
     
     if bibtex and not bibtex.exists():
-        logger.info(f'create empty bibliography database: {bibtex}')
+        logger.info('create empty bibliography database: %s', bibtex)
         bibtex.parent.mkdir(parents=True, exist_ok=True)
         bibtex.open('w', encoding="utf-8").write('')
 
     # create bibtex file if not existing
     filesdir = Path(o.filesdir) if o.filesdir else None
     if filesdir and not filesdir.exists():
-        logger.info(f'create empty files directory: {filesdir}')
+        logger.info('create empty files directory: %s', filesdir)
         filesdir.mkdir(parents=True)
 
     if o.git_lfs:
@@ -324,7 +324,7 @@ def installcmd(parser, o, config):
 
     config.backup_files = config.gitlfs
 
-    logger.info('save config file: '+config.file)
+    logger.info('save config file: %s', config.file)
     os.makedirs(os.path.dirname(config.file), exist_ok=True)
 
     config.git = o.git
@@ -333,7 +333,7 @@ def installcmd(parser, o, config):
 
     if config.git:
         if (Path(config.gitdir)/'.git').exists():
-            logger.warning(f'{config.gitdir} is already initialized')
+            logger.warning('%s is already initialized', config.gitdir)
         else:
             os.makedirs(config.gitdir, exist_ok=True)
             config.gitcmd('init')
@@ -364,15 +364,15 @@ def _dir_is_empty(dir):
 def uninstallcmd(parser, o, config):
     # TODO this is actually never tested.    
     if Path(config.file).exists():
-        logger.info(f"The uninstaller will now remove {config.file}")
+        logger.info("The uninstaller will now remove %s", config.file)
         os.remove(config.file)
         parent = os.path.dirname(config.file)
         if _dir_is_empty(parent):
-            logger.info(f"The config dir {parent} is empty and the uninstaller will now remove it.")
+            logger.info("The config dir %s is empty and the uninstaller will now remove it.", parent)
             os.rmdir(parent)
         config = Config()
     else:
-        logger.info(f"The uninstaller found no config file to remove.")
+        logger.info("The uninstaller found no config file to remove.")
         return
 
     if o.recursive:
@@ -401,8 +401,8 @@ def check_install(parser, o, config):
     elif not os.path.exists(config.bibtex):
         print(f'papers: error: no bibtex file found, do `touch {config.bibtex}` or {install_doc}')
         raise PapersExit()
-    logger.info(f'bibtex: {config.bibtex!r}')
-    logger.info(f'filesdir: {config.filesdir!r}')
+    logger.info('bibtex: %r', config.bibtex)
+    logger.info('filesdir: %r', config.filesdir)
     return True
 
 
@@ -437,36 +437,48 @@ def addcmd(parser, o, config):
         else:
             biblio.fetch_doi(o.doi, attachments=o.attachment, rename=o.rename, copy=o.copy, **kw)
 
-    for file in o.file:
-        try:
-            if os.path.isdir(file):
-                if o.recursive:
-                    biblio.scan_dir(file, rename=o.rename, copy=o.copy,
-                                search_doi=not o.no_query_doi,
-                                search_fulltext=not o.no_query_fulltext,
-                                **kw)
-                else:
-                    raise ValueError(file+' is a directory, requires --recursive to explore')
-                
-            elif file.endswith('.pdf'):
-                biblio.add_pdf(file, attachments=o.attachment, rename=o.rename, copy=o.copy,
-                           search_doi=not o.no_query_doi,
-                           search_fulltext=not o.no_query_fulltext,
-                           scholar=o.scholar, doi=o.doi,
-                           **kw)
-
-            else: # file.endswith('.bib'):
-                biblio.add_bibtex_file(file, **kw)
-
-        except Exception as error:
-            # print(error)
-            # addp.error(str(error))
-            raise
-            logger.error(str(error))
-            if not o.ignore_errors:
-                if len(o.file) or (os.isdir(file) and o.recursive)> 1:
-                    logger.error('use --ignore to add other files anyway')
-                raise PapersExit()
+    # with --jobs, fetch the PDF metadata in parallel, but insert in the order given
+    pdfs = [file for file in o.file if file.endswith('.pdf') and not os.path.isdir(file)]
+    if o.jobs <= 1 or len(pdfs) <= 1:
+        pdfs = []
+
+    with prefetch_pdf_bibtex(pdfs, jobs=o.jobs,
+                             search_doi=not o.no_query_doi,
+                             search_fulltext=not o.no_query_fulltext,
+                             scholar=o.scholar) as prefetched:
+        for file in o.file:
+            try:
+                if os.path.isdir(file):
+                    if o.recursive:
+                        biblio.scan_dir(file, rename=o.rename, copy=o.copy,
+                                    search_doi=not o.no_query_doi,
+                                    search_fulltext=not o.no_query_fulltext,
+                                    **kw)
+                    else:
+                        raise ValueError(file+' is a directory, requires --recursive to explore')
+
+                elif file in prefetched:
+                    biblio.insert_pdf_entry(file, prefetched[file].result(), rename=o.rename, copy=o.copy, **kw)
+
+                elif file.endswith('.pdf'):
+                    biblio.add_pdf(file, attachments=o.attachment, rename=o.rename, copy=o.copy,
+                               search_doi=not o.no_query_doi,
+                               search_fulltext=not o.no_query_fulltext,
+                               scholar=o.scholar, doi=o.doi,
+                               **kw)
+
+                else: # file.endswith('.bib'):
+                    biblio.add_bibtex_file(file, **kw)
+
+            except Exception as error:
+                # print(error)
+                # addp.error(str(error))
+                raise
+                logger.error(str(error))
+                if not o.ignore_errors:
+                    if len(o.file) or (os.isdir(file) and o.recursive)> 1:
+                        logger.error('use --ignore to add other files anyway')
+                    raise PapersExit()
 
     savebib(biblio, config)
 
@@ -522,7 +534,7 @@ def undocmd(parser, o, config):
     back = backupfile(config.bibtex)
     tmp = config.bibtex + '.tmp'
     # my = :config.bibtex, config.filesdir)
-    logger.info(config.bibtex+' <==> '+back)
+    logger.info('%s <==> %s', config.bibtex, back)
     shutil.copy(config.bibtex, tmp)
     shutil.move(back, config.bibtex)
     shutil.move(tmp, back)
@@ -715,6 +727,13 @@ def statuscmd(parser, o, config):
     
 
 
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f'must be a positive integer, got: {value}')
+    return n
+
+
 def get_parser(config=None):
     if config is None:
         config = papers.config.Config()
@@ -853,6 +872,8 @@ def get_parser(config=None):
     grp.add_argument('--no-query-doi', action='store_true', help='do not attempt to parse and query doi')
     grp.add_argument('--no-query-fulltext', action='store_true', help='do not attempt to query fulltext in case doi query fails')
     grp.add_argument('--scholar', action='store_true', help='use google scholar instead of crossref')
+    grp.add_argument('-j', '--jobs', type=positive_int, default=1,
+        help='number of PDFs whose metadata are extracted in parallel (default:%(default)s)')
 
     grp = addp.add_argument_group('attached files')
     grp.add_argument('-a','--attachment', nargs='+') #'supplementary material')
@@ -1020,6 +1041,7 @@ def get_parser(config=None):
 #############
 
 def main(args=None):
+    logging.basicConfig()  # no-op if the application already configured logging
     papers.config.DRYRUN = False  # reset in case main() if called directly
 
     configfile = search_config([CONFIG_FILE_LOCAL], start_dir=".", default=CONFIG_FILE)
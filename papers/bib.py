@@ -1,13 +1,11 @@
 import os
 from pathlib import Path
-import logging
 # logger.basicConfig(level=logger.INFO)
-import argparse
-import subprocess as sp
 import shutil
 import bisect
-import itertools
-import fnmatch   # unix-like match
+import pickle
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import bibtexparser
 from bibtexparser.customization import convert_to_unicode
 
@@ -19,6 +17,7 @@ from papers.extract import extract_pdf_metadata
 from papers.extract import fetch_bibtex_by_fulltext_crossref, fetch_bibtex_by_doi
 
 from papers.encoding import unicode_to_latex, unicode_to_ascii
+from papers.latexenc import latex_to_unicode
 from papers.encoding import parse_file, format_file, standard_name, family_names, format_entries, update_file_path
 
 from papers.filename import NAMEFORMAT, KEYFORMAT
@@ -118,7 +117,7 @@ def compare_entries(e1, e2, fuzzy=False):
     id1 = entry_id(e1)
     id2 = entry_id(e2)
 
-    logger.debug('{} ?= {}'.format(id1, id2))
+    logger.debug('%s ?= %s', id1, id2)
 
     if id1 == id2:
         score = GOOD_DUPLICATES
@@ -158,11 +157,40 @@ def are_duplicates(e1, e2, similarity=DEFAULT_SIMILARITY, fuzzy_ratio=FUZZY_RATI
         raise ValueError('similarity must be one of EXACT, GOOD, FAIR, PARTIAL, FUZZY')
 
     score = compare_entries(e1, e2, fuzzy=target==FUZZY_DUPLICATES)
-    logger.debug('score: {}, target: {}, similarity: {}'.format(score, target, similarity))
+    logger.debug('score: %s, target: %s, similarity: %s', score, target, similarity)
     return score >= target
 
 
 
+def fetch_pdf_bibtex(pdf, search_doi=True, search_fulltext=True, scholar=False, doi=None):
+    " bibtex string for a PDF (or for `doi` if provided) "
+    if doi:
+        return fetch_bibtex_by_doi(doi)
+    return extract_pdf_metadata(pdf, search_doi, search_fulltext, scholar=scholar)
+
+
+@contextmanager
+def prefetch_pdf_bibtex(pdfs, search_doi=True, search_fulltext=True, scholar=False, jobs=8):
+    """fetch the bibtex of several PDFs in a thread pool
+
+    Yields a {pdf: future} dict. If the block exits with an error (or Ctrl-C),
+    pending requests are cancelled instead of waited for.
+    """
+    if not pdfs:
+        yield {}
+        return
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    futures = {pdf: executor.submit(fetch_pdf_bibtex, pdf, search_doi, search_fulltext, scholar=scholar) for pdf in pdfs}
+    try:
+        yield futures
+    except BaseException:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=False)
+        raise
+    executor.shutdown()
+
+
 def hidden_bibtex(direc):
     " save metadata for a bundle of files "
     dirname = os.path.basename(direc)
@@ -177,7 +205,8 @@ def read_entry_dir(direc, update_files=True, relative_to=None):
     if not os.path.exists(hidden_bib):
         raise TypeError('hidden bib missing: not an entry dir')
 
-    db = bibtexparser.loads(open(hidden_bib).read())
+    with open(hidden_bib, encoding='utf-8') as f:
+        db = bibtexparser.loads(f.read())
     assert len(db.entries) == 1, 'hidden bib must have one entry, got: '+str(len(db.entries))
     entry = db.entries[0]
 
@@ -193,6 +222,51 @@ def read_entry_dir(direc, update_files=True, relative_to=None):
 def backupfile(bibtex):
     return os.path.join(os.path.dirname(bibtex), '.'+os.path.basename(bibtex)+'.backup')
 
+
+# PARSED BIBTEX CACHE
+# ===================
+
+def _bibcache_file():
+    """pickled database of the last saved bibtex file, in the cache directory
+
+    There is a single slot: saving another bibtex file replaces it, so that
+    one-off or temporary bibtex files do not pile up in the cache.
+    """
+    return os.path.join(papers.config.CACHE_DIR, 'bibtex.pkl')
+
+def _bibcache_stamp(bibtex):
+    st = os.stat(bibtex)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def load_bibcache(bibtex):
+    """parsed database from the cache, or None if missing or the bibtex file changed since
+    """
+    cachefile = _bibcache_file()
+    if not os.path.exists(cachefile):
+        return None
+    try:
+        with open(cachefile, 'rb') as f:
+            path, stamp, db = pickle.load(f)
+    except Exception as error:
+        logger.debug('failed to read bibtex cache: %s', error)
+        return None
+    if path != os.path.abspath(bibtex):
+        return None
+    if stamp != _bibcache_stamp(bibtex):
+        logger.debug('bibtex cache is outdated: %s', bibtex)
+        return None
+    logger.debug('load bibtex from cache: %s', cachefile)
+    return db
+
+def save_bibcache(bibtex, db):
+    " pickle the database just written to `bibtex` "
+    cachefile = _bibcache_file()
+    os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+    tmp = cachefile+'.'+str(os.getpid())+'.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump((os.path.abspath(bibtex), _bibcache_stamp(bibtex), db), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cachefile)  # atomic
+
 class DuplicateKeyError(ValueError):
     pass
 
@@ -230,6 +304,7 @@ class Biblio:
     def entries(self, entries):
         assert isinstance(entries, list)
         self.db.entries = entries
+        self._keys = [self.key(e) for e in entries]
 
     @classmethod
     def loads(cls, bibtex, filesdir):
@@ -242,8 +317,12 @@ class Biblio:
     @classmethod
     def load(cls, bibtex, filesdir, relative_to=None, **kw):
         # self.bibtex = bibtex
-        bibtexs = open(bibtex).read()
-        loaded_bib = cls(bibtexparser.loads(bibtexs), filesdir, relative_to=relative_to if relative_to is not None else os.path.dirname(bibtex), **kw)
+        db = load_bibcache(bibtex)
+        if db is None:
+            with open(bibtex, encoding='utf-8') as f:
+                bibtexs = f.read()
+            db = bibtexparser.loads(bibtexs)
+        loaded_bib = cls(db, filesdir, relative_to=relative_to if relative_to is not None else os.path.dirname(bibtex), **kw)
         return loaded_bib
 
     # make sure the path is right
@@ -258,7 +337,8 @@ class Biblio:
         assert not os.path.exists(bibtex)
         if os.path.dirname(bibtex) and not os.path.exists(os.path.dirname(bibtex)):
             os.makedirs(os.path.dirname(bibtex))
-        open(bibtex,'w').write('')
+        with open(bibtex, 'w', encoding='utf-8') as f:
+            f.write('')
         return cls.load(bibtex, filesdir, relative_to=relative_to, **kw)
 
     def key(self, e):
@@ -272,11 +352,26 @@ class Biblio:
 
 
     def sort(self):
-        self.db.entries = sorted(self.db.entries, key=self.key)
+        # compute the keys once and keep them alongside the entries, for bisect
+        keyed = sorted(((self.key(e), e) for e in self.db.entries), key=lambda ke: ke[0])
+        self._keys = [k for k, e in keyed]
+        self.db.entries = [e for k, e in keyed]
+
+    def _sorted_keys(self):
+        " keys of the (sorted) entries, in sync with self.db.entries "
+        if self._keys is None or len(self._keys) != len(self.db.entries):
+            # db.entries was modified from outside
+            self._keys = [self.key(e) for e in self.db.entries]
+        return self._keys
 
     def index_sorted(self, entry):
-        keys = [self.key(ei) for ei in self.db.entries]
-        return bisect.bisect_left(keys, self.key(entry))
+        return bisect.bisect_left(self._sorted_keys(), self.key(entry))
+
+    def _remove_entry(self, entry):
+        keys = self._sorted_keys()
+        i = self.entries.index(entry)
+        del keys[i]
+        del self.db.entries[i]
 
 
     def insert_entry(self, entry, update_key=False, check_duplicate=False, rename=False, copy=False, **checkopt):
@@ -290,22 +385,27 @@ class Biblio:
         else:
             logger.debug('check duplicates : FALSE')
 
-        i = self.index_sorted(entry)  # based on current sort key (e.g. ID)
+        keys = self._sorted_keys()
+        key = self.key(entry)
+        i = bisect.bisect_left(keys, key)  # based on current sort key (e.g. ID)
 
-        if i < len(self.entries) and self.key(self.entries[i]) == self.key(entry):
-            logger.info('key duplicate: '+self.key(self.entries[i]))
+        if i < len(keys) and keys[i] == key:
+            logger.info('key duplicate: %s', key)
 
             if update_key:
                 newkey = self.append_abc_to_key(entry)  # add abc
-                logger.info('update key: {} => {}'.format(entry['ID'], newkey))
+                logger.info('update key: %s => %s', entry['ID'], newkey)
                 entry['ID'] = newkey
+                key = self.key(entry)
+                i = bisect.bisect_left(keys, key)
 
             else:
                 raise DuplicateKeyError('this error can be avoided if update_key is True')
 
         else:
-            logger.info('new entry: '+self.key(entry))
+            logger.info('new entry: %s', key)
 
+        keys.insert(i, key)
         self.entries.insert(i, entry)
 
         if rename: self.rename_entry_files(entry, copy=copy)
@@ -322,7 +422,7 @@ class Biblio:
 
         elif duplicates:
             # some duplicates...
-            logger.debug('duplicate(s) found: {}'.format(len(duplicates)))
+            logger.debug('duplicate(s) found: %s', len(duplicates))
 
             # pick only the most similar duplicate, if more than one
             # the point of check_duplicate is to avoid increasing disorder, not to clean the existing mess
@@ -337,7 +437,7 @@ class Biblio:
                 return  # do nothing
 
             if update_key and entry['ID'] != candidate['ID']:
-                logger.info('duplicate :: update key to match existing entry: {} => {}'.format(entry['ID'], candidate['ID']))
+                logger.info('duplicate :: update key to match existing entry: %s => %s', entry['ID'], candidate['ID'])
                 entry['ID'] = candidate['ID']
 
             if mergefiles:
@@ -354,27 +454,28 @@ class Biblio:
                 if rename: self.rename_entry_files(candidate, copy=copy)
                 return  # do nothing
 
-            logger.debug('conflict resolution: '+on_conflict)
+            logger.debug('conflict resolution: %s', on_conflict)
             resolved = conflict_resolution_on_insert(candidate, entry, mode=on_conflict)
-            self.entries.remove(candidate) # maybe in resolved entries
+            self._remove_entry(candidate) # maybe in resolved entries
             for e in resolved:
                 self.insert_entry(e, update_key, rename=rename, copy=copy)
 
 
     def generate_key(self, entry):
         " generate a unique key not yet present in the record "
-        keys = {self.key(e) for e in self.db.entries}
+        keys = set(self._sorted_keys())
         key = self.keyformat(entry)
         if keys and key in keys: # and not isinstance(keys, set):
             key = append_abc(key, keys)
         return key
 
     def append_abc_to_key(self, entry):
-        return append_abc(entry['ID'], keys={self.key(e) for e in self.entries})
+        return append_abc(entry['ID'], keys=set(self._sorted_keys()))
 
 
     def set_files(self, entry, files, relative_to=None):
-        entry['file'] = format_file(list(sorted(set(files), key=lambda f: files.index(f))), relative_to=relative_to or self.relative_to)
+        # remove duplicates but keep the order
+        entry['file'] = format_file(list(dict.fromkeys(files)), relative_to=relative_to or self.relative_to)
 
     def get_files(self, entry, relative_to=None):
         return parse_file(entry.get('file', ''), relative_to=relative_to or self.relative_to)
@@ -397,7 +498,8 @@ class Biblio:
 
 
     def add_bibtex_file(self, file, **kw):
-        bibtex = open(file).read()
+        with open(file, encoding='utf-8') as f:
+            bibtex = f.read()
         return self.add_bibtex(bibtex, relative_to=os.path.dirname(file), **kw)
 
 
@@ -407,12 +509,23 @@ class Biblio:
 
 
     def add_pdf(self, pdf, attachments=None, search_doi=True, search_fulltext=True, scholar=False, doi=None, **kw):
+        bibtex = fetch_pdf_bibtex(pdf, search_doi, search_fulltext, scholar=scholar, doi=doi)
+        self.insert_pdf_entry(pdf, bibtex, attachments=attachments, **kw)
+
+
+    def add_pdfs(self, pdfs, search_doi=True, search_fulltext=True, scholar=False, jobs=8, **kw):
+        """add several PDFs at once
+
+        The metadata extraction (pdftotext and network requests) is I/O-bound
+        and runs in a thread pool, while the entries are inserted one by one,
+        in the order of `pdfs`.
+        """
+        with prefetch_pdf_bibtex(pdfs, search_doi, search_fulltext, scholar=scholar, jobs=jobs) as futures:
+            for pdf in pdfs:
+                self.insert_pdf_entry(pdf, futures[pdf].result(), **kw)
 
-        if doi:
-            bibtex = fetch_bibtex_by_doi(doi)
-        else:
-            bibtex = extract_pdf_metadata(pdf, search_doi, search_fulltext, scholar=scholar)
 
+    def insert_pdf_entry(self, pdf, bibtex, attachments=None, **kw):
         bib = bibtexparser.loads(bibtex)
         entry = bib.entries[0]
 
@@ -425,7 +538,7 @@ class Biblio:
 
         self.set_files(entry, [os.path.abspath(f) for f in files])
         entry['ID'] = self.generate_key(entry)
-        logger.debug('generated PDF key: '+entry['ID'])
+        logger.debug('generated PDF key: %s', entry['ID'])
 
         kw.pop('update_key', True)
             # logger.warn('fetched key is always updated when adding PDF to existing bib')
@@ -445,8 +558,8 @@ class Biblio:
                 try:
                     entry = read_entry_dir(root, relative_to=self.relative_to)
                     self.insert_entry(entry, **kw)
-                except Exception:
-                    logger.warn(root+'::'+str(error))
+                except Exception as error:
+                    logger.warn('%s::%s', root, error)
                 continue
 
             for file in files:
@@ -459,7 +572,7 @@ class Biblio:
                     elif file.endswith('.bib'):
                         self.add_bibtex_file(path, **kw)
                 except Exception as error:
-                    logger.warn(path+'::'+str(error))
+                    logger.warn('%s::%s', path, error)
                     continue
 
 
@@ -472,7 +585,13 @@ class Biblio:
         if self.relative_to not in (os.path.sep, None) and Path(self.relative_to).resolve() != Path(bibtex).parent.resolve():
             logger.warn("Saving bibtex file with relative paths may break links. Consider using `Biblio.update_file_path(Path(bibtex).parent)` before.")
         s = self.format()
-        open(bibtex, 'w').write(s)
+        # bibtexparser already joins the formatted entries: write the str in one go
+        with open(bibtex, 'w', encoding='utf-8') as f:
+            f.write(s)
+        try:
+            save_bibcache(bibtex, self.db)
+        except Exception as error:
+            logger.warn('failed to cache bibtex: %s', error)
 
 
     def update_file_path(self, relative_to):
@@ -487,7 +606,7 @@ class Biblio:
             if update is not None:
                 updates.append(update)
         if len(updates):
-            logger.info(f"{len(updates)} entry files were updated")
+            logger.info("%s entry files were updated", len(updates))
         self.relative_to = relative_to
 
 
@@ -525,7 +644,7 @@ class Biblio:
             newfile = os.path.join(direc, newname+ext)
             if not os.path.exists(file):
                 raise ValueError(file+': original file link is broken')
-            elif file != newfile:
+            elif os.path.abspath(file) != os.path.abspath(newfile):
                 self.move(file, newfile, copy, hardlink=hardlink)
                 # assert os.path.exists(newfile)
                 # if not copy:
@@ -543,7 +662,7 @@ class Biblio:
                 newfile = os.path.join(newdir, os.path.basename(file))
                 if not os.path.exists(file):
                     raise ValueError(file+': original file link is broken')
-                elif file != newfile:
+                elif os.path.abspath(file) != os.path.abspath(newfile):
                     self.move(file, newfile, copy, hardlink=hardlink)
                     # assert os.path.exists(newfile)
                     count += 1
@@ -556,7 +675,7 @@ class Biblio:
             db.entries.append(e)
             bibtex = bibtexparser.dumps(db)
             if not papers.config.DRYRUN:
-                with open(bibname,'w') as f:
+                with open(bibname, 'w', encoding='utf-8') as f:
                     f.write(bibtex)
 
             # remove old direc if empty?
@@ -564,17 +683,17 @@ class Biblio:
             if len(direcs) == 1:
                 leftovers = os.listdir(direcs[0])
                 if not leftovers or len(leftovers) == 1 and leftovers[0] == os.path.basename(hidden_bibtex(direcs[0])):
-                    logger.debug('remove tree: '+direcs[0])
+                    logger.debug('remove tree: %s', direcs[0])
                     if not papers.config.DRYRUN:
                         shutil.rmtree(direcs[0])
             else:
-                logger.debug('some left overs, do not remove tree: '+direcs[0])
+                logger.debug('some left overs, do not remove tree: %s', direcs[0])
 
         # for f in parse_file(e['file'], self.relative_to):
         #     assert os.path.exists(f), f
 
         if count > 0:
-            logger.info('renamed file(s): {}'.format(count))
+            logger.info('renamed file(s): %s', count)
 
 
     def rename_entries_files(self, copy=False, relative_to=None, hardlink=False):
@@ -599,13 +718,13 @@ class Biblio:
                 if k in e:
                     e[k] = standard_name(e[k])
                     if e[k] != e_old[k]:
-                        logger.info(e.get('ID','')+': '+k+' name formatted')
+                        logger.info('%s: %s name formatted', e.get('ID',''), k)
 
         if encoding:
 
             assert encoding in ['unicode','latex'], e.get('ID','')+': unknown encoding: '+repr(encoding)
 
-            logger.debug(e.get('ID','')+': update encoding')
+            logger.debug('%s: update encoding', e.get('ID',''))
             if encoding == "unicode":
                 e = convert_to_unicode(e)
             else:
@@ -618,43 +737,43 @@ class Biblio:
                                 e[k] = unicode_to_latex(e[k])
                         # except KeyError as error:
                         except (KeyError, ValueError) as error:
-                            logger.warn(e.get('ID','')+': '+k+': failed to encode: '+str(error))
+                            logger.warn('%s: %s: failed to encode: %s', e.get('ID',''), k, error)
 
         if fix_doi:
             if 'doi' in e and e['doi']:
                 try:
                     doi = parse_doi('doi:'+e['doi'])
                 except:
-                    logger.warn(e.get('ID','')+': failed to fix doi: '+e['doi'])
+                    logger.warn('%s: failed to fix doi: %s', e.get('ID',''), e['doi'])
                     return
 
                 if doi.lower() != e['doi'].lower():
-                    logger.info(e.get('ID','')+': fix doi: {} ==> {}'.format(e['doi'], doi))
+                    logger.info('%s: fix doi: %s ==> %s', e.get('ID',''), e['doi'], doi)
                     e['doi'] = doi
                 else:
-                    logger.debug(e.get('ID','')+': doi OK')
+                    logger.debug('%s: doi OK', e.get('ID',''))
             else:
-                logger.debug(e.get('ID','')+': no DOI')
+                logger.debug('%s: no DOI', e.get('ID',''))
 
 
         if fetch or fetch_all:
             bibtex = None
             if 'doi' in e and e['doi']:
-                logger.info(e.get('ID','')+': fetch doi: '+e['doi'])
+                logger.info('%s: fetch doi: %s', e.get('ID',''), e['doi'])
                 try:
                     bibtex = fetch_bibtex_by_doi(e['doi'])
                 except Exception as error:
-                    logger.warn('...failed to fetch bibtex (doi): '+str(error))
+                    logger.warn('...failed to fetch bibtex (doi): %s', error)
 
             elif e.get('title','') and e.get('author','') and fetch_all:
                 kw = {}
                 kw['title'] = e['title']
                 kw['author'] = ' '.join(family_names(e['author']))
-                logger.info(e.get('ID','')+': fetch-all: '+str(kw))
+                logger.info('%s: fetch-all: %s', e.get('ID',''), kw)
                 try:
                     bibtex = fetch_bibtex_by_fulltext_crossref('', **kw)
                 except Exception as error:
-                    logger.warn('...failed to fetch/update bibtex (all): '+str(error))
+                    logger.warn('...failed to fetch/update bibtex (all): %s', error)
 
             if bibtex:
                 db = bibtexparser.loads(bibtex)
@@ -672,11 +791,15 @@ class Biblio:
             if auto_key or not isvalidkey(e.get('ID','')):
                 key = self.generate_key(e)
                 if e.get('ID', '') != key:
-                    logger.info('update key {} => {}'.format(e.get('ID', ''), key))
+                    logger.info('update key %s => %s', e.get('ID', ''), key)
                     e['ID'] = key
+                    self._keys = None  # invalidate cached keys
 
         if key_ascii:
-            e['ID'] = unicode_to_ascii(e['ID'])
+            key = unicode_to_ascii(e['ID'])
+            if key != e['ID']:
+                e['ID'] = key
+                self._keys = None
 
         if interactive and e_old != e:
             print(bcolors.OKBLUE+'*** UPDATE ***'+bcolors.ENDC)
@@ -685,6 +808,7 @@ class Biblio:
             if input('update ? [Y/n] or [Enter] ').lower() not in ('', 'y'):
                 logger.info('cancel changes')
                 e.update(e_old)
+                self._keys = None
                 for k in list(e.keys()):
                     if k not in e_old:
                         del e[k]
@@ -729,7 +853,7 @@ def entry_filecheck(e, delete_broken=False, fix_mendeley=False,
 
         realpath = os.path.realpath(file)
         if realpath in realpaths:
-            logger.info(e['ID']+': remove duplicate path: "{}"'.format(fixed.get(file, file)))
+            logger.info('%s: remove duplicate path: "%s"', e['ID'], fixed.get(file, file))
             continue
         realpaths.add(realpath) # put here so that for identical
                                    # files that are checked and finally not
@@ -742,7 +866,7 @@ def entry_filecheck(e, delete_broken=False, fix_mendeley=False,
             try:
                 file = latex_to_unicode(file)
             except KeyError as error:
-                logger.warn(e['ID']+': '+str(error)+': failed to convert latex symbols to unicode: '+file)
+                logger.warn('%s: %s: failed to convert latex symbols to unicode: %s', e['ID'], error, file)
 
             # fix root (e.g. path starts with home instead of /home)
             dirname = os.path.dirname(file)
@@ -755,7 +879,7 @@ def entry_filecheck(e, delete_broken=False, fix_mendeley=False,
                     file = candidate
 
             if old != file:
-                logger.info(e['ID']+': file name fixed: "{}" => "{}".'.format(old, file))
+                logger.info('%s: file name fixed: "%s" => "%s".', e['ID'], old, file)
                 fixed[old] = file # keep record of fixed files
 
         # parse PDF and check for metadata
@@ -767,9 +891,9 @@ def entry_filecheck(e, delete_broken=False, fix_mendeley=False,
 
         # check existence
         if not os.path.exists(file):
-            logger.warn(e['ID']+': "{}" does not exist'.format(file)+delete_broken*' ==> delete')
+            logger.warn('%s: "%s" does not exist%s', e['ID'], file, delete_broken*' ==> delete')
             if delete_broken:
-                logger.info('delete file from entry: "{}"'.format(file))
+                logger.info('delete file from entry: "%s"', file)
                 continue
             elif interactive:
                 ans = input('delete file from entry ? [Y/n] ')
@@ -780,7 +904,7 @@ def entry_filecheck(e, delete_broken=False, fix_mendeley=False,
             # hash_ = hashlib.sha256(open(file, 'rb').read()).digest()
             hash_ = checksum(file) # a little faster
             if hash_ in hashes:
-                logger.info(e['ID']+': file already exists (identical checksum): "{}"'.format(file))
+                logger.info('%s: file already exists (identical checksum): "%s"', e['ID'], file)
                 continue
             hashes.add(hash_)
 
@@ -2,6 +2,8 @@ import os, json
 from pathlib import Path
 import subprocess as sp, sys
 import hashlib
+import threading
+import time
 import bibtexparser
 from papers import logger
 from papers.filename import Format, NAMEFORMAT, KEYFORMAT
@@ -89,7 +91,7 @@ class Config:
             return str((self.root / p).relative_to(self.root))
         except Exception as error:
             print(error)
-            logger.warn(f"config :: can't save {p} as relative path to {self.root}")
+            logger.warn("config :: can't save %s as relative path to %s", p, self.root)
             return p
 
     def _abspath(self, p, root=None):
@@ -183,8 +185,12 @@ class Config:
             status = bcolors.WARNING+' (missing)'+bcolors.ENDC
         elif check_files:
             try:
-                bibtexstring = open(self.bibtex).read()
-                db = bibtexparser.loads(bibtexstring)
+                from papers.bib import load_bibcache  # avoid circular import
+                # the cache is only valid for the file as last saved, which then parsed fine
+                db = load_bibcache(self.bibtex)
+                if db is None:
+                    with open(self.bibtex, encoding='utf-8') as f:
+                        db = bibtexparser.loads(f.read())
                 if len(db.entries):
                     status = bcolors.OKBLUE+' ({} entries)'.format(len(db.entries))+bcolors.ENDC
                 else:
@@ -215,32 +221,98 @@ class Config:
 
 def _init_cache():
     if not os.path.exists(CACHE_DIR):
-        logger.info('make cache directory for DOI requests: '+CACHE_DIR)
+        logger.info('make cache directory for DOI requests: %s', CACHE_DIR)
         os.makedirs(CACHE_DIR)
 
 _init_cache()
 
-def cached(file, hashed_key=False):
+def _read_cache(file):
+    """read a cache file written as one json record per line
+
+    Older versions dumped the whole cache as a single json dict, which
+    reads the same way (a single line without trailing newline).
+    """
+    cache = {}
+    newline = True
+    if os.path.exists(file):
+        with open(file) as f:
+            for line in f:
+                newline = line.endswith('\n')
+                if not line.strip():
+                    continue
+                try:
+                    cache.update(json.loads(line))
+                except ValueError:
+                    logger.warn('skip corrupted cache record in %s', file)
+    return cache, newline
+
+
+# how long failed requests are remembered (in seconds)
+ERROR_TTL = 24*3600  # client errors (e.g. 404 for a garbled DOI)
+ERROR_TTL_SERVER = 3600  # server errors, or unknown status
+ERROR_NOT_CACHED = (408, 429)  # request timeout, rate limiting: retry right away
+
+def _error_ttl(status):
+    if status in ERROR_NOT_CACHED:
+        return 0
+    return ERROR_TTL if status is not None and 400 <= status < 500 else ERROR_TTL_SERVER
+
+
+def cached(file, hashed_key=False, error=None):
+    """cache function results on disk
+
+    error : exception class, optional
+        if provided, such exceptions raised by the function are cached as well
+        and raised again on subsequent calls, until they expire (see ERROR_TTL).
+        Timeouts and rate limiting (ERROR_NOT_CACHED) are never cached.
+        The status code is read from the exception's `status` attribute.
+    """
 
     file = os.path.join(CACHE_DIR, file)
 
     def decorator(fun):
-        if os.path.exists(file):
-            cache = json.load(open(file))
-        else:
-            cache = {}
+        cache, newline = _read_cache(file)
+        state = {'newline': newline}
+        lock = threading.Lock()  # papers add --jobs
+
+        def _write(key, res):
+            if DRYRUN:
+                return
+            # append the new record instead of re-writing the whole cache
+            with lock, open(file, 'a') as f:
+                if not state['newline']:
+                    f.write('\n')
+                    state['newline'] = True
+                f.write(json.dumps({key: res})+'\n')
+
         def decorated(doi):
             if hashed_key: # use hashed parameter as key (for full text query)
                 key = hashlib.sha256(doi.encode('utf-8')).hexdigest()[:6]
             else:
                 key = doi
+            res = cache.get(key)
+            if isinstance(res, dict) and '__error__' in res:
+                if error is not None and time.time() - res['ts'] < _error_ttl(res['status']):
+                    logger.debug('load error from cache: %r', (file, key))
+                    cached_error = error(res['__error__'])
+                    cached_error.status = res['status']
+                    raise cached_error
+                cache.pop(key, None)  # expired: try again
             if key in cache:
-                logger.debug('load from cache: '+repr((file, key)))
+                logger.debug('load from cache: %r', (file, key))
                 return cache[key]
-            else:
-                res = cache[key] = fun(doi)
-                if not DRYRUN:
-                    json.dump(cache, open(file,'w'))
+            try:
+                res = fun(doi)
+            except Exception as e:
+                status = getattr(e, 'status', None)
+                if error is not None and isinstance(e, error) and _error_ttl(status) > 0:
+                    # only keep a short message: the error page itself is of no use
+                    message = (str(e).splitlines() or [''])[0][:200]
+                    cache[key] = {'__error__': message, 'status': status, 'ts': time.time()}
+                    _write(key, cache[key])
+                raise
+            cache[key] = res
+            _write(key, res)
             return res
         return decorated
-    return decorator
\ No newline at end of file
+    return decorator
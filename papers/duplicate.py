@@ -82,10 +82,10 @@ def search_duplicates(entries, key=None, eq=None, issorted=False, filter_key=Non
     for e, g in grouped:
         group = list(g)
         if len(group) > 1 and (not filter_key or filter_key(e)):
-            logger.info('key:'+str(e))
+            logger.info('key:%s', e)
             duplicates.append(group)
         else:
-            logger.debug('unique:'+str(e))
+            logger.debug('unique:%s', e)
             unique_entries.extend(group)
 
     return unique_entries, duplicates
@@ -283,15 +283,19 @@ def entry_sdiff(entries, color=True, bcolors=bcolors, best=None):
 # ==================
 
 def merge_files(entries, relative_to=None):
-    checksums = []
+    checksums = set()
     files = []
+    seen = set()
     for e in entries:
         for f in parse_file(e.get('file',''), relative_to=relative_to):
+            if f in seen:
+                continue  # do not read the same file twice
+            seen.add(f)
             check = checksum(f) if os.path.exists(f) else None
-            if f not in files and (check is None or check not in checksums):
+            if check is None or check not in checksums:
                 files.append(f)
                 if check is not None:
-                    checksums.append(check)
+                    checksums.add(check)
     return format_file(files, relative_to=relative_to)
 
 
@@ -549,7 +553,7 @@ def check_duplicates(entries, key=None, eq=None, issorted=False, filter_key=None
     !! resolved duplicates are appended to the list of entries
     """
     entries, duplicate_groups = search_duplicates(entries, key, eq, issorted, filter_key)
-    logger.info(str(len(duplicate_groups))+' duplicate(s)')
+    logger.info('%s duplicate(s)', len(duplicate_groups))
 
     for duplicates in duplicate_groups:
         try:
@@ -1,4 +1,5 @@
 import os
+import logging
 import bibtexparser
 from unidecode import unidecode as unicode_to_ascii
 from papers.latexenc import unicode_to_latex
@@ -64,7 +65,7 @@ def update_file_path(entry, from_relative_to, to_relative_to, check=False):
                 assert os.path.exists(f), f"{f} does not exist"
         new_file = format_file(file_path, to_relative_to)
         if new_file != old_file:
-            logger.debug(f"""update_file_path {entry.get("ID")} {old_file} (relative to {repr(from_relative_to)}) {new_file} (relative to {repr(to_relative_to)})""")
+            logger.debug("update_file_path %s %s (relative to %r) %s (relative to %r)", entry.get("ID"), old_file, from_relative_to, new_file, to_relative_to)
             # logger.debug(f"""{entry.get("ID")}: update file {old_file} to {new_file}""")
         entry["file"] = new_file
         if old_file != new_file:
@@ -74,13 +75,13 @@ def update_file_path(entry, from_relative_to, to_relative_to, check=False):
 def format_file(files, relative_to=None):
     # make sure the path is right
     if relative_to is not None:
-        msg = f"FORMAT FILE {', '.join(files)}"
+        oldfiles = files
         if relative_to == os.path.sep:
             files = [os.path.abspath(p) for p in files]
         else:
             files = [os.path.normpath(os.path.relpath(p, relative_to)) for p in files]
-        msg += f" => {', '.join(files)}"
-        logger.debug(msg)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("FORMAT FILE %s => %s", ', '.join(oldfiles), ', '.join(files))
     return ';'.join([_format_file(f) for f in files])
 
 
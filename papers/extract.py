@@ -4,6 +4,7 @@ import subprocess as sp
 import re
 import tempfile
 
+import requests
 from crossref.restful import Works, Etiquette
 import bibtexparser
 
@@ -13,24 +14,52 @@ from papers import logger
 from papers.encoding import family_names
 from bibtexparser.customization import convert_to_unicode
 
+try:
+    import pdftotext as _pdftotext  # optional: poppler python bindings, avoids the subprocess
+except ImportError:
+    _pdftotext = None
+
+try:
+    import pypdf as _pypdf  # optional: read the DOI from the PDF metadata
+except ImportError:
+    _pypdf = None
+
 my_etiquette = Etiquette('papers', papers.__version__, 'https://github.com/perrette/papers', 'mahe.perrette@gmail.com')
 
+# shared session: keep the connection alive across DOI requests
+_SESSION = requests.Session()
+_SESSION.headers.update({'user-agent': str(my_etiquette)})
+
 
 class DOIParsingError(ValueError):
     pass
 
 class DOIRequestError(ValueError):
-    pass
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
 
 
 # PDF parsing / crossref requests
 # ===============================
 
+def _readpdf_inprocess(pdf, first=None, last=None):
+    with open(pdf, 'rb') as f:
+        pages = _pdftotext.PDF(f)
+    first = 1 if first is None else first
+    last = len(pages) if last is None else min(last, len(pages))
+    logger.info('pdftotext (python) -f %s -l %s %s', first, last, pdf)
+    # same page separator as the pdftotext command
+    return ''.join(pages[i]+'\f' for i in range(first-1, last))
+
+
 def readpdf(pdf, first=None, last=None):
-    # TODO the python package pdftotext can do this directly, with no temp file and no I/O.
     if not os.path.isfile(pdf):
         raise ValueError(repr(pdf) + ": not a file")
 
+    if _pdftotext is not None:
+        return _readpdf_inprocess(pdf, first, last)
+
     tmptxt = tempfile.mktemp(suffix='.txt')
 
     cmd = ['pdftotext']
@@ -77,31 +106,42 @@ def readpdf_image(pdf, first=None, last=None):
 
     return txt
 
-REGEXP = re.compile(r'[doi,doi.org/][\s\.\:]{0,2}(10\.\d{4}[\d\:\.\-\/a-z]+)[A-Z\s,\n]')
+# https://www.crossref.org/blog/dois-and-matching-regular-expressions/
+# a. /^10.\d{4,9}/[-._;()/:A-Z0-9]+$/i  (matches the vast majority of DOIs)
+# b. /^10.1002/[^\s]+$/i
+# c. /^10.\d{4}/\d+-\d+X?(\d+)\d+<[\d\w]+:[\d\w]*>\d+.\d+.\w+;\d$/i
+# d. /^10.1021/\w\w\d++$/i
+# e. /^10.1207/[\w\d]+\&\d+_\d+$/i
+DOI_PATTERN = r'10\.\d{4,9}/[-._;()/:A-Z0-9+]+'
+REGEXP = re.compile(r'(?:\bdoi\s*[:.]?\s*|\bdoi/|doi\.org/)('+DOI_PATTERN+')', re.IGNORECASE)  # explicit doi prefix
+REGEXP_BARE = re.compile(r'\b('+DOI_PATTERN+')', re.IGNORECASE)
+
+def _strip_doi(doi):
+    " remove trailing punctuation and unbalanced closing brackets "
+    while True:
+        doi = doi.rstrip('.,;:')
+        if doi.endswith(')') and doi.count(')') > doi.count('('):
+            doi = doi[:-1]
+        else:
+            return doi
 
 def parse_doi(txt):
-    # based on: https://doeidoei.wordpress.com/2009/10/22/regular-expression-to-match-a-doi-digital-object-identifier/
-    # doi = r'[doi|DOI][\s\.\:]{0,2}(10\.\d{4}[\d\:\.\-\/a-z]+)[A-Z\s]'
-
-    # maybe try that? (need to convert to python-regex)
-    # https://www.crossref.org/blog/dois-and-matching-regular-expressions/
-    # a. /^10.\d{4,9}/[-._;()/:A-Z0-9]+$/i
-    # b. /^10.1002/[^\s]+$/i
-    # c. /^10.\d{4}/\d+-\d+X?(\d+)\d+<[\d\w]+:[\d\w]*>\d+.\d+.\w+;\d$/i
-    # d. /^10.1021/\w\w\d++$/i
-    # e. /^10.1207/[\w\d]+\&\d+_\d+$/i
-
-    matches = REGEXP.findall(' '+txt.lower()+' ')
-
-    if not matches:
+    # only the first match is used: stop scanning there
+    # page by page (pdftotext separates pages with form feeds), so that a DOI cited on
+    # a later page never beats the article's own: on each page, prefer DOIs introduced
+    # as such (doi:, doi.org/...), otherwise any DOI-like string
+    for page in txt.split('\f'):
+        match = REGEXP.search(page) or REGEXP_BARE.search(page)
+        if match is not None:
+            break
+
+    if match is None:
         raise DOIParsingError('parse_doi::no matches')
 
-    match = matches[0]
-
     # clean expression
-    doi = match.replace('\n','').strip('.')
+    doi = _strip_doi(match.group(1).lower())
 
-    if doi.lower().endswith('.received'):
+    if doi.endswith('.received'):
         doi = doi[:-len('.received')]
 
     # quality check
@@ -126,16 +166,70 @@ def pdfhead(pdf, maxpages=10, minwords=200, image=False):
     i = 0
     txt = ''
     while len(txt.strip().split()) < minwords and i < maxpages:
-        i += 1
-        logger.debug('read pdf page: '+str(i))
         if image:
+            i += 1
+            logger.debug('read pdf page: %s', i)
             txt += readpdf_image(pdf, first=i, last=i)
         else:
-            txt += readpdf(pdf, first=i, last=i)
+            # the first page is often a cover or blank: read two pages in one call
+            first = i + 1
+            i = min(2, maxpages) if i == 0 else first
+            logger.debug('read pdf pages: %s-%s', first, i)
+            txt += readpdf(pdf, first=first, last=i)
     return txt
 
 
+XMP_DOI = re.compile(r'<(?:prism:doi|pdfx:doi|dc:identifier)>([^<]+)<|(?:prism|pdfx):doi="([^"]+)"')
+
+def _pdf_metadata_strings(reader):
+    " candidate strings for a DOI: document info, XMP metadata, first page text annotations "
+    info = reader.metadata or {}
+    for k in ['/doi', '/DOI']:
+        if k in info:
+            yield 'doi:'+str(info[k])
+
+    root = reader.trailer['/Root']
+    if '/Metadata' in root:
+        xmp = root['/Metadata'].get_object().get_data().decode('utf-8', 'ignore')
+        for m in XMP_DOI.finditer(xmp):
+            yield 'doi:'+(m.group(1) or m.group(2)).strip()
+
+    for k in ['/Subject', '/Keywords']:
+        if k in info:
+            yield str(info[k])
+
+    if len(reader.pages):
+        for annot in reader.pages[0].get('/Annots') or []:
+            annot = annot.get_object()
+            # not links: the first page often links to cited or companion articles
+            if annot.get('/Subtype') in ('/Text', '/FreeText') and '/Contents' in annot:
+                yield str(annot['/Contents'])
+
+
+def pdf_metadata_doi(pdf):
+    """DOI from the PDF metadata, or None if not found (or pypdf is not installed)
+
+    This is much cheaper than converting the first pages to text.
+    """
+    if _pypdf is None:
+        return None
+    try:
+        reader = _pypdf.PdfReader(pdf)
+        for txt in _pdf_metadata_strings(reader):
+            try:
+                return parse_doi(txt)
+            except DOIParsingError:
+                continue
+    except Exception as error:
+        logger.debug('failed to read pdf metadata: %s', error)
+    return None
+
+
 def extract_pdf_doi(pdf, image=False):
+    doi = pdf_metadata_doi(pdf)
+    if doi:
+        logger.debug('doi found in pdf metadata')
+        return doi
     return parse_doi(pdfhead(pdf, image=image))
 
 
@@ -171,13 +265,13 @@ def extract_txt_metadata(txt, search_doi=True, search_fulltext=False, max_query_
         try:
             logger.debug('parse doi')
             doi = parse_doi(txt)
-            logger.info('found doi:'+doi)
+            logger.info('found doi:%s', doi)
             logger.debug('query bibtex by doi')
             bibtex = fetch_bibtex_by_doi(doi)
             logger.debug('doi query successful')
 
         except DOIParsingError as error:
-            logger.debug('doi parsing error: '+str(error))
+            logger.debug('doi parsing error: %s', error)
 
         except DOIRequestError as error:
             return '''@misc{{{doi},
@@ -205,28 +299,35 @@ def extract_txt_metadata(txt, search_doi=True, search_fulltext=False, max_query_
 
 
 def extract_pdf_metadata(pdf, search_doi=True, search_fulltext=True, maxpages=10, minwords=200, image=False, **kw):
+    if search_doi:
+        doi = pdf_metadata_doi(pdf)
+        if doi:
+            logger.debug('doi found in pdf metadata')
+            return extract_txt_metadata('doi:'+doi, search_doi=True, search_fulltext=False, **kw)
     txt = pdfhead(pdf, maxpages, minwords, image=image)
     return extract_txt_metadata(txt, search_doi, search_fulltext, **kw)
 
 
 
-@cached('crossref-bibtex.json')
+@cached('crossref-bibtex.json', error=DOIRequestError)
 def fetch_bibtex_by_doi(doi):
-    url = "http://api.crossref.org/works/"+doi+"/transform/application/x-bibtex"
-    work = Works(etiquette=my_etiquette)
-    response = work.do_http_request('get', url, custom_header={'user-agent': str(work.etiquette)})
+    # content negotiation works for all DOI registration agencies (crossref, datacite...)
+    url = "https://doi.org/"+doi
+    response = _SESSION.get(url, headers={'accept': 'application/x-bibtex; charset=utf-8'}, timeout=30)
     if response.ok:
+        response.encoding = response.encoding or 'utf-8'  # skip charset detection
         bibtex = response.text.strip()
         return bibtex
-    raise DOIRequestError(repr(doi)+': '+response.text)
+    raise DOIRequestError(f'{doi!r}: HTTP {response.status_code} {response.reason}', status=response.status_code)
 
 
 @cached('crossref.json')
 def fetch_json_by_doi(doi):
-    url = "http://api.crossref.org/works/"+doi+"/transform/application/json"
-    work = Works(etiquette=my_etiquette)
-    jsontxt = work.do_http_request('get', url, custom_header={'user-agent': str(work.etiquette)}).text
-    return jsontxt.dumps(json)
+    url = "https://api.crossref.org/works/"+doi+"/transform/application/json"
+    response = _SESSION.get(url, timeout=30)
+    if response.ok:
+        return response.text
+    raise DOIRequestError(f'{doi!r}: HTTP {response.status_code} {response.reason}', status=response.status_code)
 
 
 def _get_page_fast(pagerequest):
@@ -335,7 +436,7 @@ def crossref_to_bibtex(r):
 # @cached('crossref-bibtex-fulltext.json', hashed_key=True)
 def fetch_bibtex_by_fulltext_crossref(txt, **kw):
     work = Works(etiquette=my_etiquette)
-    logger.debug('crossref fulltext seach:\n'+txt)
+    logger.debug('crossref fulltext seach:\n%s', txt)
 
     # get the most likely match of the first results
     # results = []
@@ -355,7 +456,7 @@ def fetch_bibtex_by_fulltext_crossref(txt, **kw):
             if score > maxscore:
                 maxscore = score
                 result = res
-        logger.info('score: '+str(maxscore))
+        logger.info('score: %s', maxscore)
 
     elif len(results) == 0:
         raise ValueError('crossref fulltext: no results')
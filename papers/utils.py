@@ -85,19 +85,23 @@ def checksum(fname):
 # move / copy
 def move(f1, f2, copy=False, interactive=True, dryrun=False, hardlink=False):
     maybe = 'dry-run:: ' if dryrun else ''
+    if os.path.abspath(f1) == os.path.abspath(f2):
+        logger.info('dest is identical to src: %s', f1)
+        return
     dirname = os.path.dirname(f2)
     if dirname and not os.path.exists(dirname):
-        logger.info(f'{maybe}create directory: {dirname}')
-        if not dryrun: os.makedirs(dirname)
-    if f1 == f2:
-        logger.info('dest is identical to src: '+f1)
-        return
+        logger.info('%screate directory: %s', maybe, dirname)
+        if not dryrun: os.makedirs(dirname, exist_ok=True)
 
     if os.path.exists(f2):
+        # same file through a symlink: removing f1 would lose it
+        if os.path.realpath(f1) == os.path.realpath(f2):
+            logger.info('dest is identical to src: %s', f1)
+            return
         # if identical file, pretend nothing happened, skip copying
         if os.path.samefile(f1, f2) or checksum(f2) == checksum(f1):
             if not copy and not dryrun:
-                logger.info(f'{maybe}rm {f1}')
+                logger.info('%srm %s', maybe, f1)
                 os.remove(f1)
             return
 
@@ -106,22 +110,21 @@ def move(f1, f2, copy=False, interactive=True, dryrun=False, hardlink=False):
             if ans.lower() != 'y':
                 return
         else:
-            logger.info(f'{maybe}rm {f2}')
+            logger.info('%srm %s', maybe, f2)
             if not dryrun:
                 os.remove(f2)
 
     if copy:
         # If we can do a hard-link instead of copy-ing, let's do:
         def _hardlink(f1, f2):
-            cmd = f'{maybe}ln {f1} {f2}'
-            logger.info(cmd)
+            logger.info('%sln %s %s', maybe, f1, f2)
             if not dryrun:
                 os.link(f1, f2)
 
         def _copy(f1, f2):
-            logger.info(f'{maybe}cp {f1} {f2}')
+            logger.info('%scp %s %s', maybe, f1, f2)
             if not dryrun:
-                shutil.copy(f1, f2)
+                shutil.copy2(f1, f2)  # also keep the modification time
 
         if hardlink:
             try:
@@ -132,10 +135,12 @@ def move(f1, f2, copy=False, interactive=True, dryrun=False, hardlink=False):
             _copy(f1, f2)
 
     else:
-        cmd = f'{maybe}mv {f1} {f2}'
-        logger.info(cmd)
+        logger.info('%smv %s %s', maybe, f1, f2)
         if not dryrun:
-            shutil.move(f1, f2)
+            try:
+                os.replace(f1, f2)  # same file system: no data copy
+            except OSError:
+                shutil.move(f1, f2)  # e.g. across file systems
 
 
 
@@ -4,6 +4,7 @@ import tempfile
 import shutil
 # import json
 import unittest
+from unittest import mock
 import difflib
 from tests.download import downloadpdf
 from pathlib import Path
@@ -39,18 +40,38 @@ def call(f, *args, check=False, check_output=False, cwd=None, **kwargs):
         except:
             return 1
 
-def speedy_paperscmd(cmd, sp_cmd=None, cwd=None, **kw):
-    if '<' in cmd:
-        return reliable_paperscmd(cmd, sp_cmd, cwd, **kw)
+def split_stdin(cmd):
+    """split a shell-like command into the command proper and its stdin, if redirected
+
+    Supported forms are a here-document (`cmd << EOF\n...\nEOF`), a file redirection (`cmd < file`)
+    and a piped echo (`echo answer | cmd`).
+    """
+    if cmd.startswith('echo ') and '|' in cmd:
+        echo, cmd = cmd.split('|', 1)
+        return cmd, io.StringIO(echo[len('echo '):].strip()+'\n')
+    elif '<<' in cmd:
+        cmd, heredoc = cmd.split('<<', 1)
+        delimiter, _, body = heredoc.partition('\n')
+        lines = body.splitlines(True)
+        if lines and lines[-1].strip() == delimiter.strip():
+            lines = lines[:-1]
+        return cmd, io.StringIO(''.join(lines))
+    elif '<' in cmd:
+        cmd, file = cmd.split('<', 1)
+        return cmd, open(file.strip())
+    return cmd, None
+
 
+def speedy_paperscmd(cmd, sp_cmd=None, cwd=None, **kw):
     check = sp_cmd is None or "check" in sp_cmd
     check_output = sp_cmd == 'check_output'
-    args = shlex.split(cmd)
-    if cwd:
-        with set_directory(cwd):
+    with set_directory(cwd or os.getcwd()):
+        cmd, stdin = split_stdin(cmd)
+        args = shlex.split(cmd)
+        if stdin is None:
+            return call(main, args, check=check, check_output=check_output)
+        with stdin, mock.patch('sys.stdin', stdin):
             return call(main, args, check=check, check_output=check_output)
-    else:
-        return call(main, args, check=check, check_output=check_output)
 
 def paperscmd(cmd, *args, reliable=None, **kwargs):
     if reliable:
@@ -0,0 +1,17 @@
+import pytest
+
+import papers.config
+
+
+@pytest.fixture(autouse=True, scope='session')
+def cache_dir(tmp_path_factory):
+    """keep the bibtex cache written by Biblio.save out of the user's cache directory
+
+    XDG_CACHE_HOME covers the tests that run papers in a subprocess.
+    """
+    cache_home = tmp_path_factory.mktemp('cache')
+    mp = pytest.MonkeyPatch()
+    mp.setenv('XDG_CACHE_HOME', str(cache_home))
+    mp.setattr(papers.config, 'CACHE_DIR', str(cache_home / 'papers'))
+    yield papers.config.CACHE_DIR
+    mp.undo()
@@ -1,6 +1,5 @@
 import os
 import shutil
-import subprocess as sp
 import tempfile
 import unittest
 from pathlib import Path
@@ -8,7 +7,7 @@ from pathlib import Path
 import bibtexparser
 
 from papers.bib import Biblio
-from tests.common import PAPERSCMD, paperscmd, prepare_paper, prepare_paper2, BibTest
+from tests.common import paperscmd, prepare_paper, prepare_paper2, BibTest
 
 
 class TestAdd(unittest.TestCase):
@@ -175,6 +174,15 @@ class TestAddBib(unittest.TestCase):
         self.assertEqual(bib.db.entries[0]['ID'], self.key1)
         self.assertTrue(self.key2 not in [e['ID'] for e in self.my.db.entries])
 
+    def test_addbib_cmd_jobs(self):
+        paperscmd(f'add {self.somebib} --bibtex {self.mybib} --jobs 4')
+        bib = Biblio.load(self.mybib, '')
+        self.assertEqual(len(bib.db.entries), 2)
+
+    def test_jobs_must_be_positive(self):
+        func = lambda: paperscmd(f'add {self.somebib} --bibtex {self.mybib} --jobs 0')
+        self.assertRaises(SystemExit, func)
+
     def test_attachment_fails_with_multiple_entries(self):
         func = lambda: paperscmd(f'add {self.pdf} {self.pdf} --bibtex {self.mybib} --filesdir {self.filesdir} --attachment {self.pdf}')
         self.assertRaises(Exception, func)
@@ -354,7 +362,7 @@ class TestAddConflict(BibTest):
     def test_add_same_but_key_interactive(self):
         # fails in raise mode
         open(self.otherbib, 'w').write(self.bibtex_otherkey)
-        sp.check_call(f'echo u | {PAPERSCMD} add {self.otherbib} --bibtex {self.mybib}', shell=True)
+        paperscmd(f'echo u | add {self.otherbib} --bibtex {self.mybib}', sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), self.bibtex) # entries did not change
 
 
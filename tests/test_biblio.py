@@ -1,6 +1,10 @@
 import os
 import unittest
 import tempfile
+import time
+from unittest import mock
+import bibtexparser
+import papers.config
 from papers.bib import Biblio
 from tests.common import prepare_paper
 
@@ -18,4 +22,106 @@ class TestBiblio(unittest.TestCase):
 
     def tearDown(self):
         os.remove(self.mybib)
-        # os.remove(self.somebib)
\ No newline at end of file
+        # os.remove(self.somebib)
+
+class TestInsertSorted(unittest.TestCase):
+
+    bibtex = """@article{Bbb2000,
+ title = {B}
+}
+
+@article{Aaa2000,
+ title = {A}
+}"""
+
+    def setUp(self):
+        self.biblio = Biblio.loads(self.bibtex, '')
+
+    def _keys(self):
+        return [e['ID'] for e in self.biblio.entries]
+
+    def test_sorted_on_load(self):
+        self.assertEqual(self._keys(), ['Aaa2000', 'Bbb2000'])
+
+    def test_insert_sorted(self):
+        self.biblio.insert_entry({'ID': 'Abc2000', 'ENTRYTYPE': 'article'})
+        self.biblio.insert_entry({'ID': 'Ccc2000', 'ENTRYTYPE': 'article'})
+        self.assertEqual(self._keys(), ['Aaa2000', 'Abc2000', 'Bbb2000', 'Ccc2000'])
+
+    def test_insert_update_key_sorted(self):
+        self.biblio.insert_entry({'ID': 'Aaa2000', 'ENTRYTYPE': 'article', 'title': 'C'}, update_key=True)
+        self.assertEqual(self._keys(), ['Aaa2000', 'Aaa2000b', 'Bbb2000'])
+
+
+class TestAddPdfs(unittest.TestCase):
+
+    def _fetch(self, pdf, *args, **kwargs):
+        name = os.path.basename(pdf)[:-4]
+        return '@article{%s,\n title = {%s},\n year = {2000}\n}' % (name, name)
+
+    def test_add_pdfs(self):
+        biblio = Biblio(keyformat=lambda e: e['title'])
+        pdfs = [f'/tmp/paper{i}.pdf' for i in [2, 0, 1]]
+        with mock.patch('papers.bib.fetch_pdf_bibtex', self._fetch):
+            biblio.add_pdfs(pdfs, jobs=2, check_duplicate=False)
+        self.assertEqual([e['ID'] for e in biblio.entries], ['paper0', 'paper1', 'paper2'])
+        self.assertEqual([e['file'] for e in biblio.entries], [f':/tmp/paper{i}.pdf:pdf' for i in range(3)])
+
+    def test_add_pdfs_error_cancels_pending(self):
+        calls = []
+        def fetch(pdf, *args, **kwargs):
+            calls.append(pdf)
+            if pdf.endswith('paper0.pdf'):
+                raise ValueError('no metadata')
+            time.sleep(0.05)
+            return self._fetch(pdf)
+        biblio = Biblio(keyformat=lambda e: e['title'])
+        pdfs = [f'/tmp/paper{i}.pdf' for i in range(20)]
+        with mock.patch('papers.bib.fetch_pdf_bibtex', fetch):
+            self.assertRaises(ValueError, biblio.add_pdfs, pdfs, jobs=1, check_duplicate=False)
+        self.assertLess(len(calls), len(pdfs))
+
+
+class TestBibCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.mybib = os.path.join(self.temp_dir.name, 'papers.bib')
+        self.patch = mock.patch.object(papers.config, 'CACHE_DIR', self.temp_dir.name)
+        self.patch.start()
+        biblio = Biblio.loads(TestInsertSorted.bibtex, '')
+        biblio.save(self.mybib)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_load_from_cache(self):
+        with mock.patch('bibtexparser.loads') as loads:
+            biblio = Biblio.load(self.mybib, '')
+        loads.assert_not_called()
+        self.assertEqual([e['ID'] for e in biblio.entries], ['Aaa2000', 'Bbb2000'])
+
+    def test_cache_outdated(self):
+        with open(self.mybib, 'a') as f:
+            f.write('\n@article{Ccc2000,\n title = {C}\n}\n')
+        biblio = Biblio.load(self.mybib, '')
+        self.assertEqual([e['ID'] for e in biblio.entries], ['Aaa2000', 'Bbb2000', 'Ccc2000'])
+
+    def test_single_slot(self):
+        other = os.path.join(self.temp_dir.name, 'other.bib')
+        Biblio.loads(TestInsertSorted.bibtex, '').save(other)
+        self.assertEqual(os.listdir(self.temp_dir.name).count('bibtex.pkl'), 1)
+        with mock.patch('bibtexparser.loads', wraps=bibtexparser.loads) as loads:
+            Biblio.load(self.mybib, '')
+        loads.assert_called_once()
+
+    def test_status_from_cache(self):
+        config = papers.config.Config(bibtex=self.mybib)
+        with mock.patch('bibtexparser.loads') as loads:
+            status = config.status(check_files=True)
+        loads.assert_not_called()
+        self.assertIn('(2 entries)', status)
+        with open(self.mybib, 'a') as f:
+            f.write('\n@article{Ccc2000,\n title = {C}\n}\n')
+        self.assertIn('(3 entries)', config.status(check_files=True))
@@ -1,12 +1,11 @@
 import os
-import subprocess as sp
 import tempfile
 import unittest
 
 import bibtexparser
 
 from papers.bib import Biblio
-from tests.common import PAPERSCMD, paperscmd, BibTest
+from tests.common import paperscmd, BibTest
 
 
 class SimilarityBase(unittest.TestCase):
@@ -202,14 +201,14 @@ class TestAddResolveDuplicate(BibTest):
         os.remove(self.otherbib)
 
     def command(self, mode):
-        return f'echo {mode} | {PAPERSCMD} add {self.otherbib} --bibtex {self.mybib} --debug'
+        return f'echo {mode} | add {self.otherbib} --bibtex {self.mybib} --debug'
 
     def test_overwrite(self):
 
         expected = self.conflict
 
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('o'), shell=True)
+        paperscmd(self.command('o'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -218,12 +217,12 @@ class TestAddResolveDuplicate(BibTest):
         expected = self.original
 
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('s'), shell=True)
+        paperscmd(self.command('s'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
     def test_append(self):
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('a'), shell=True)
+        paperscmd(self.command('a'), sp_cmd='check_call')
         # paperscmd(f'add {} --bibtex {} --debug'.format(self.otherbib, self.mybib))
         expected = self.conflict + '\n\n' + self.original
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
@@ -232,7 +231,7 @@ class TestAddResolveDuplicate(BibTest):
     def test_raises(self):
         # update key to new entry, but does not merge...
         open(self.otherbib, 'w').write(self.conflict)
-        func = lambda: sp.check_call(self.command('r'), shell=True)
+        func = lambda: paperscmd(self.command('r'), sp_cmd='check_call')
         self.assertRaises(Exception, func)
 
 
@@ -246,7 +245,7 @@ class TestAddResolveDuplicate(BibTest):
 }"""
 
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('u'), shell=True)
+        paperscmd(self.command('u'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -260,7 +259,7 @@ class TestAddResolveDuplicate(BibTest):
 }"""
 
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('U'), shell=True)
+        paperscmd(self.command('U'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -273,7 +272,7 @@ class TestAddResolveDuplicate(BibTest):
  year = {RareYear}
 }"""
         open(self.otherbib, 'w').write(self.conflict)
-        sp.check_call(self.command('U') + ' --update-key', shell=True)
+        paperscmd(self.command('U') + ' --update-key', sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -281,7 +280,7 @@ class TestAddResolveDuplicate(BibTest):
 class TestAddResolveDuplicateCommand(TestAddResolveDuplicate):
 
     def command(self, mode):
-        return f'{PAPERSCMD} add {self.otherbib} --bibtex {self.mybib} --mode {mode} --debug'
+        return f'add {self.otherbib} --bibtex {self.mybib} --mode {mode} --debug'
 
 
 
@@ -309,20 +308,20 @@ class TestCheckResolveDuplicate(BibTest):
         os.remove(self.mybib)
 
     def command(self, mode):
-        return f'echo {mode} | {PAPERSCMD} check --duplicates --bibtex {self.mybib} --debug'
+        return f'echo {mode} | check --duplicates --bibtex {self.mybib} --debug'
 
     def test_pick_conflict_1(self):
 
         expected = self.conflict
 
-        sp.check_call(self.command('1'), shell=True)
+        paperscmd(self.command('1'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
     def test_pick_reference_2(self):
 
         expected = self.original
 
-        sp.check_call(self.command('2'), shell=True)
+        paperscmd(self.command('2'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -330,7 +329,7 @@ class TestCheckResolveDuplicate(BibTest):
 
         expected = self.conflict + '\n\n' + self.original
 
-        sp.check_call(self.command('s'), shell=True)
+        paperscmd(self.command('s'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
@@ -338,24 +337,24 @@ class TestCheckResolveDuplicate(BibTest):
 
         expected = self.conflict + '\n\n' + self.original
 
-        sp.check_call(self.command('n'), shell=True)
+        paperscmd(self.command('n'), sp_cmd='check_call')
         self.assertMultiLineEqual(open(self.mybib).read().strip(), expected) # entries did not change
 
 
     def test_raises(self):
         # update key to new entry, but does not merge...
-        func = lambda: sp.check_call(self.command('r'), shell=True)
+        func = lambda: paperscmd(self.command('r'), sp_cmd='check_call')
         self.assertRaises(Exception, func)
 
 
     def test_merge(self):
-        # update key to new entry, but does not merge...
+        # merge, then pick the merged entry (3)
         expected = """@article{AnotherKey,
-         author = {New Author Field},
-         doi = {10.5194/bg-8-515-2011},
-         journal = {ConflictJournal},
-         year = {RareYear}
-        }"""
-        func = lambda: sp.check_call(self.command('m\n3'), shell=True)
-        self.assertRaises(Exception, func)
+ author = {New Author Field},
+ doi = {10.5194/bg-8-515-2011},
+ journal = {ConflictJournal},
+ year = {RareYear}
+}"""
+        paperscmd(self.command('m\n3'), sp_cmd='check_call')
+        self.assertMultiLineEqual(open(self.mybib).read().strip(), expected)
 
@@ -1,9 +1,12 @@
 import unittest
 import os
+import tempfile
+from unittest import mock
 
-from papers.extract import extract_pdf_metadata
+from papers.extract import extract_pdf_metadata, parse_doi, DOIParsingError, DOIRequestError, pdf_metadata_doi, pdfhead, readpdf, fetch_json_by_doi
 from papers.bib import bibtexparser
 from tests.common import paperscmd, prepare_paper
+from tests.download import DOWNDIR
 
 
 class TestSimple(unittest.TestCase):
@@ -22,4 +25,151 @@ class TestSimple(unittest.TestCase):
         self.assertEqual(db1.entries, db2.entries)
 
     def test_fetch_scholar(self):
-        extract_pdf_metadata(self.pdf, scholar=True)
\ No newline at end of file
+        extract_pdf_metadata(self.pdf, scholar=True)
+
+
+class TestParseDoi(unittest.TestCase):
+
+    def test_parse_doi_txt(self):
+        txt = open(os.path.join(DOWNDIR, 'bg-8-515-2011.txt')).read()
+        self.assertEqual(parse_doi(txt), '10.5194/bg-8-515-2011')
+
+    def test_parse_doi_case(self):
+        self.assertEqual(parse_doi('DOI: 10.5194/BG-8-515-2011'), '10.5194/bg-8-515-2011')
+
+    def test_parse_doi_end_of_text(self):
+        self.assertEqual(parse_doi('doi:10.5194/bg-8-515-2011.'), '10.5194/bg-8-515-2011')
+
+    def test_parse_doi_no_match(self):
+        self.assertRaises(DOIParsingError, parse_doi, 'no identifier in here')
+        self.assertRaises(DOIParsingError, parse_doi, 'doing 10.1234 times')
+
+    def test_parse_doi_prefer_prefixed(self):
+        self.assertEqual(parse_doi('see 10.1002/abc and doi:10.5194/bg-8-515-2011'), '10.5194/bg-8-515-2011')
+        self.assertEqual(parse_doi('see 10.1002/abcd'), '10.1002/abcd')
+
+    def test_parse_doi_pages(self):
+        pages = ['www.pnas.org 10.1073/pnas.0805260105'+' word'*250, 'references: doi:10.1038/35057062']
+        self.assertEqual(parse_doi('\f'.join(pages)), '10.1073/pnas.0805260105')
+
+    def test_parse_doi_url_prefix(self):
+        self.assertEqual(parse_doi('see 10.1002/abcd, www.pnas.org/cgi/doi/10.1073/pnas.0805260105'), '10.1073/pnas.0805260105')
+
+    def test_parse_doi_brackets(self):
+        self.assertEqual(parse_doi('(https://doi.org/10.1002/(sici)1097-0258).'), '10.1002/(sici)1097-0258')
+
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+@unittest.skipIf(pypdf is None, 'requires pypdf')
+class TestPdfMetadataDoi(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = tempfile.mktemp(suffix='.pdf')
+        self.writer = pypdf.PdfWriter()
+        self.writer.add_blank_page(width=200, height=200)
+
+    def _write(self):
+        with open(self.pdf, 'wb') as f:
+            self.writer.write(f)
+
+    def tearDown(self):
+        if os.path.exists(self.pdf):
+            os.remove(self.pdf)
+
+    def test_info(self):
+        self.writer.add_metadata({'/doi': '10.5194/bg-8-515-2011'})
+        self._write()
+        self.assertEqual(pdf_metadata_doi(self.pdf), '10.5194/bg-8-515-2011')
+
+    def test_subject(self):
+        self.writer.add_metadata({'/Subject': 'Biogeosciences, 8 (2011) 515-524. doi:10.5194/bg-8-515-2011'})
+        self._write()
+        self.assertEqual(pdf_metadata_doi(self.pdf), '10.5194/bg-8-515-2011')
+
+    def test_text_annotation(self):
+        from pypdf.annotations import Text
+        self.writer.add_annotation(0, Text(rect=(0, 0, 100, 20), text='doi:10.5194/bg-8-515-2011'))
+        self._write()
+        self.assertEqual(pdf_metadata_doi(self.pdf), '10.5194/bg-8-515-2011')
+
+    def test_link(self):
+        # links may point to other articles: left to the page text
+        from pypdf.annotations import Link
+        self.writer.add_annotation(0, Link(rect=(0, 0, 100, 20), url='https://doi.org/10.5194/bg-8-515-2011'))
+        self._write()
+        self.assertIsNone(pdf_metadata_doi(self.pdf))
+
+    def test_none(self):
+        self._write()
+        self.assertIsNone(pdf_metadata_doi(self.pdf))
+
+
+class TestPdfHead(unittest.TestCase):
+
+    def _pdfhead(self, words_per_call, **kw):
+        calls = []
+        def readpdf(pdf, first=None, last=None):
+            calls.append((first, last))
+            return 'word '*words_per_call
+        with mock.patch('papers.extract.readpdf', readpdf):
+            pdfhead('some.pdf', **kw)
+        return calls
+
+    def test_first_two_pages_in_one_call(self):
+        self.assertEqual(self._pdfhead(500), [(1, 2)])
+
+    def test_then_page_by_page(self):
+        self.assertEqual(self._pdfhead(80, minwords=200), [(1, 2), (3, 3), (4, 4)])
+
+    def test_maxpages(self):
+        self.assertEqual(self._pdfhead(0, maxpages=1), [(1, 1)])
+
+
+class FakePDF(list):
+    " stands for pdftotext.PDF: a sequence of page texts "
+    def __init__(self, f):
+        super().__init__(['page1', 'page2', 'page3'])
+
+
+class TestReadPdfInProcess(unittest.TestCase):
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            self.pdf = f.name
+        self.patch = mock.patch('papers.extract._pdftotext', mock.Mock(PDF=FakePDF))
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        os.remove(self.pdf)
+
+    def test_pages(self):
+        self.assertEqual(readpdf(self.pdf, first=2, last=2), 'page2\f')
+        self.assertEqual(readpdf(self.pdf, first=1, last=2), 'page1\fpage2\f')
+
+    def test_whole_document(self):
+        self.assertEqual(readpdf(self.pdf), 'page1\fpage2\fpage3\f')
+
+    def test_last_clamped(self):
+        self.assertEqual(readpdf(self.pdf, first=2, last=10), 'page2\fpage3\f')
+        self.assertEqual(readpdf(self.pdf, first=5, last=6), '')
+
+    def test_pdfhead(self):
+        self.assertEqual(pdfhead(self.pdf, maxpages=3, minwords=10), 'page1\fpage2\fpage3\f')
+
+
+class TestFetchJson(unittest.TestCase):
+
+    def test_error_not_cached(self):
+        response = mock.Mock(ok=False, status_code=404, reason='Not Found', text='<html>not found</html>')
+        with mock.patch('papers.extract._SESSION') as session:
+            session.get.return_value = response
+            for _ in range(2):
+                with self.assertRaises(DOIRequestError) as cm:
+                    fetch_json_by_doi('10.1234/missing-json')
+            self.assertEqual(cm.exception.status, 404)
+            self.assertEqual(session.get.call_count, 2)
@@ -121,11 +121,11 @@ class TestLocalInstall(TestBaseInstall):
 
     def test_install_interactive(self):
         # fully interactive install
-        sp.check_call(f"""{PAPERSCMD} install --local << EOF
+        self.papers(f"""install --local << EOF
 {self.mybib}
 {self.filesdir}
 n
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         self.assertTrue(self._exists(CONFIG_FILE_LOCAL))
         self.assertTrue(self._exists(self.mybib))
         self.assertTrue(self._exists(self.filesdir))
@@ -135,13 +135,13 @@ EOF""", shell=True, cwd=self.temp_dir.name)
         self.assertFalse(config.git)
 
         # Now try simple carriage return (select default)
-        sp.check_call(f"""{PAPERSCMD} install --local << EOF
+        self.papers(f"""install --local << EOF
 
 e
 
 
 
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         self.assertTrue(self._exists(CONFIG_FILE_LOCAL))
         self.assertTrue(self._exists(self.mybib))
         self.assertTrue(self._exists(self.filesdir))
@@ -150,11 +150,11 @@ EOF""", shell=True, cwd=self.temp_dir.name)
         self.assertEqual(config.filesdir, os.path.abspath(self._path(self.filesdir)))
 
         # edit existing install (--edit)
-        sp.check_call(f"""{PAPERSCMD} install --local --bibtex {self.mybib}XX << EOF
+        self.papers(f"""install --local --bibtex {self.mybib}XX << EOF
 e
 y
 n
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         config = Config.load(self._path(CONFIG_FILE_LOCAL))
         self.assertEqual(config.bibtex, os.path.abspath(self._path(self.mybib + "XX")))
         # The files folder from previous install is remembered
@@ -162,11 +162,11 @@ EOF""", shell=True, cwd=self.temp_dir.name)
         self.assertFalse(config.git)
 
         # overwrite existing install (--force)
-        sp.check_call(f"""{PAPERSCMD} install --local --bibtex {self.mybib}XX << EOF
+        self.papers(f"""install --local --bibtex {self.mybib}XX << EOF
 o
 y
 n
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         config = Config.load(self._path(CONFIG_FILE_LOCAL))
         self.assertEqual(config.bibtex, os.path.abspath(self._path(self.mybib + "XX")))
         # The files folder from previous install was forgotten
@@ -174,12 +174,12 @@ EOF""", shell=True, cwd=self.temp_dir.name)
         self.assertFalse(config.git)
 
         # reset default values from install
-        sp.check_call(f"""{PAPERSCMD} install --local << EOF
+        self.papers(f"""install --local << EOF
 e
 reset
 reset
 n
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         config = Config.load(self._path(CONFIG_FILE_LOCAL))
         self.assertEqual(config.bibtex, None)
         # The files folder from previous install was forgotten
@@ -187,13 +187,13 @@ EOF""", shell=True, cwd=self.temp_dir.name)
         self.assertFalse(config.git)
 
         # install with git tracking
-        sp.check_call(f"""{PAPERSCMD} install --local << EOF
+        self.papers(f"""install --local << EOF
 e
 
 
 y
 y
-EOF""", shell=True, cwd=self.temp_dir.name)
+EOF""", sp_cmd='check_call')
         config = Config.load(self._path(CONFIG_FILE_LOCAL))
         ## by default another bib is detected, because it starts with a (sorted)
         self.assertEqual(config.bibtex, os.path.abspath(self._path(self.anotherbib)))
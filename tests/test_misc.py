@@ -0,0 +1,120 @@
+import os
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import papers.config
+from papers.config import cached
+from papers.utils import move
+
+
+class RequestError(ValueError):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.temp_dir.name, 'cache.json')
+        self.calls = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _cached(self):
+        with mock.patch.object(papers.config, 'CACHE_DIR', self.temp_dir.name):
+            @cached('cache.json', error=RequestError)
+            def fun(key):
+                self.calls.append(key)
+                if key == 'missing':
+                    raise RequestError('not found\n<html>error page</html>', status=404)
+                if key == 'busy':
+                    raise RequestError('too many requests', status=429)
+                return key.upper()
+        return fun
+
+    def test_cache_append(self):
+        fun = self._cached()
+        self.assertEqual(fun('a'), 'A')
+        self.assertEqual(fun('a'), 'A')
+        self.assertEqual(fun('b'), 'B')
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertEqual(open(self.file).read().splitlines(), ['{"a": "A"}', '{"b": "B"}'])
+        # reloaded from disk
+        fun = self._cached()
+        self.assertEqual(fun('a'), 'A')
+        self.assertEqual(self.calls, ['a', 'b'])
+
+    def test_cache_legacy(self):
+        json.dump({'a': 'legacy'}, open(self.file, 'w'))
+        fun = self._cached()
+        self.assertEqual(fun('a'), 'legacy')
+        self.assertEqual(fun('b'), 'B')
+        fun = self._cached()
+        self.assertEqual(fun('a'), 'legacy')
+        self.assertEqual(fun('b'), 'B')
+        self.assertEqual(self.calls, ['b'])
+
+    def test_cache_error(self):
+        fun = self._cached()
+        self.assertRaises(RequestError, fun, 'missing')
+        fun = self._cached()
+        with self.assertRaises(RequestError) as cm:
+            fun('missing')
+        self.assertEqual(cm.exception.status, 404)
+        self.assertEqual(str(cm.exception), 'not found')
+        self.assertEqual(self.calls, ['missing'])
+
+    def test_cache_error_rate_limited(self):
+        fun = self._cached()
+        self.assertRaises(RequestError, fun, 'busy')
+        self.assertRaises(RequestError, fun, 'busy')
+        self.assertEqual(self.calls, ['busy', 'busy'])
+        self.assertFalse(os.path.exists(self.file))
+
+    def test_cache_error_expired(self):
+        fun = self._cached()
+        self.assertRaises(RequestError, fun, 'missing')
+        with mock.patch('time.time', return_value=time.time()+papers.config.ERROR_TTL+1):
+            self.assertRaises(RequestError, fun, 'missing')
+        self.assertEqual(self.calls, ['missing', 'missing'])
+
+
+class TestMove(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, 'a.pdf')
+        with open(self.src, 'w') as f:
+            f.write('content')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_path_is_kept(self):
+        # the same file under another spelling must not be removed as a "duplicate"
+        other = os.path.join(self.tmp.name, 'sub', '..', 'a.pdf')
+        os.makedirs(os.path.join(self.tmp.name, 'sub'))
+        move(self.src, other)
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_symlink_is_kept(self):
+        link = os.path.join(self.tmp.name, 'link.pdf')
+        os.symlink(self.src, link)
+        move(self.src, link)
+        self.assertTrue(os.path.exists(self.src))
+        self.assertTrue(os.path.exists(link))
+
+    def test_removed_directory_is_recreated(self):
+        dest = os.path.join(self.tmp.name, 'dir', 'b.pdf')
+        move(self.src, dest, copy=True)
+        shutil.rmtree(os.path.dirname(dest))
+        move(self.src, dest)
+        self.assertTrue(os.path.exists(dest))
+        self.assertFalse(os.path.exists(self.src))